@@ -1,12 +1,15 @@
 import os
 from flask import Flask
+from flask_compress import Compress
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase
 from flask_login import LoginManager
 import logging
+from utils.log_format import configure_logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging (LOG_LEVEL=DEBUG for verbose output)
+configure_logging()
 logger = logging.getLogger('app')
 
 class Base(DeclarativeBase):
@@ -17,24 +20,39 @@ db = SQLAlchemy(model_class=Base)
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "quiz_bot_secret_key_for_flask_sessions")
 
+# Compress responses (gzip/br) for clients that accept it
+Compress(app)
+
 # configure the database, relative to the app instance folder
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
+    "pool_recycle": 1800,
     "pool_pre_ping": True,
 }
+
+def is_memory_database(database_url):
+    """In-memory SQLite runs on a StaticPool, which takes no pool sizing options"""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+if app.config["SQLALCHEMY_DATABASE_URI"] and not is_memory_database(app.config["SQLALCHEMY_DATABASE_URI"]):
+    # Sized for the web server and the bot's concurrent handlers sharing one engine.
+    # LIFO checkout keeps a small set of connections warm and lets idle ones expire.
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"].update({
+        "pool_size": 20,
+        "max_overflow": 40,
+        "pool_timeout": 10,
+        "pool_use_lifo": True,
+    })
 # initialize the app with the extension, flask-sqlalchemy >= 3.0.x
 db.init_app(app)
 
-with app.app_context():
-    # Make sure to import the models here or their tables won't be created
-    try:
-        import models  # noqa: F401
-        db.create_all()
-        logger.debug("Database tables created")
-    except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
-        raise
+# Import the models so their tables are registered on db.metadata.
+# The schema itself is managed by Alembic: run `alembic upgrade head` before starting.
+import models  # noqa: F401,E402
+import utils.analytics_daily  # noqa: F401,E402  (registers the analytics_daily view DDL)
 
 @app.errorhandler(404)
 def page_not_found(e):
@@ -1,22 +1,104 @@
 import os
+import asyncio
 import logging
-import threading
-import signal
-from telegram import Update, ParseMode, InlineKeyboardButton, InlineKeyboardMarkup
+import sys
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable
+from cachetools import TTLCache
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.request import HTTPXRequest
 from telegram.ext import (
-    Updater, CommandHandler, MessageHandler, Filters, 
-    CallbackQueryHandler, ConversationHandler, CallbackContext
+    Application, BaseUpdateProcessor, CommandHandler, MessageHandler, filters,
+    CallbackQueryHandler, ConversationHandler, ContextTypes
 )
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from models import User, Quiz, Question, QuizAttempt, ChatGroup, QuizSession, Analytics
-from app import db
-from config import TELEGRAM_BOT_TOKEN, OWNER_ID
+from app import app, db
+from config import TELEGRAM_BOT_TOKEN, OWNER_ID, REDIS_URL
+from utils.analytics_buffer import AnalyticsBuffer
+from utils.log_format import configure_logging
+from utils.send_queue import TelegramSendQueue, reply_to_kwargs
+from utils.session_store import QuizSessionStore
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Configure logging (LOG_LEVEL=DEBUG for verbose output)
+configure_logging()
 logger = logging.getLogger('bot')
 
+# Maximum number of updates processed at the same time
+MAX_CONCURRENT_UPDATES = 256
+
+# Threads running blocking database work (asyncio.to_thread), one per pooled connection.
+# Falls back to SQLAlchemy's default pool size when the pool isn't sized (in-memory SQLite).
+_engine_options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+DB_EXECUTOR_THREADS = _engine_options.get("pool_size", 5) + _engine_options.get("max_overflow", 10)
+
+# Pooled HTTP/2 connections shared by all Bot API calls
+TELEGRAM_CONNECTION_POOL_SIZE = 256
+
+# Outgoing messages are delivered through a shared rate limited queue
+send_queue = TelegramSendQueue()
+
+# Analytics events and last active times are written in batches
+analytics_buffer = AnalyticsBuffer()
+
+# Live quiz session state is kept in Redis when it is configured
+session_store = QuizSessionStore(REDIS_URL) if REDIS_URL else None
+
+# Recently seen users: telegram_id -> (user id, is_admin).
+# Only accessed from the event loop, so no locking is needed.
+USER_CACHE = TTLCache(maxsize=50_000, ttl=300)
+
+# Callback data prefix (the part before the first "_") -> handler(update, context, arg).
+# Filled in by initialize_bot() once all handlers are defined.
+CALLBACK_ROUTES = {}
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently while keeping per-chat ordering.
+
+    Updates from different chats run in parallel, updates from the same chat
+    are serialized behind a per-chat lock so handlers never race each other.
+
+    process_update() holds the base class semaphore while an update waits for
+    its chat's lock, so that semaphore is left unbounded and the number of
+    running updates is limited here instead, once an update has its chat's
+    turn. A busy chat then can't take the slots of all the other chats.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(sys.maxsize)
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chat_locks = weakref.WeakValueDictionary()
+
+    def _get_lock(self, chat_id):
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._chat_locks[chat_id] = lock
+        return lock
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            async with self._running:
+                await coroutine
+            return
+
+        async with self._get_lock(chat.id):
+            async with self._running:
+                await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
 def initialize_bot():
     """Initialize and configure the Telegram bot"""
     # Check if token is available
@@ -24,11 +106,16 @@ def initialize_bot():
         logger.error("Telegram Bot Token not set in environment variables!")
         raise ValueError("TELEGRAM_BOT_TOKEN is required")
     
-    # Create the Updater and pass it the bot token
-    updater = Updater(token=TELEGRAM_BOT_TOKEN, use_context=True)
-    
-    # Get the dispatcher to register handlers
-    dp = updater.dispatcher
+    # Create the Application and pass it the bot token
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(HTTPXRequest(connection_pool_size=TELEGRAM_CONNECTION_POOL_SIZE, http_version="2"))
+        .concurrent_updates(PerChatUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Check for API ID and Hash
     telegram_api_id = os.environ.get('TELEGRAM_API_ID')
@@ -45,36 +132,40 @@ def initialize_bot():
         logger.warning("Owner ID is not set! Admin features will not be available.")
     
     # Register command handlers
-    dp.add_handler(CommandHandler("start", start_command))
-    dp.add_handler(CommandHandler("help", help_command))
-    dp.add_handler(CommandHandler("profile", user_profile))
-    dp.add_handler(CommandHandler("quizzes", list_quizzes))
-    dp.add_handler(CommandHandler("quiz", start_quiz))
-    dp.add_handler(CommandHandler("marathon", lambda update, context: start_quiz(update, context, marathon=True)))
-    dp.add_handler(CommandHandler("skip", skip_question))
-    dp.add_handler(CommandHandler("pause", pause_quiz))
-    dp.add_handler(CommandHandler("resume", resume_quiz))
-    dp.add_handler(CommandHandler("end", end_quiz))
-    dp.add_handler(CommandHandler("search", search_quizzes))
-    dp.add_handler(CommandHandler("view", view_quiz_details))
-    dp.add_handler(CommandHandler("report", generate_report))
+    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("profile", user_profile))
+    application.add_handler(CommandHandler("quizzes", list_quizzes))
+    application.add_handler(CommandHandler("quiz", start_quiz))
+    application.add_handler(CommandHandler("marathon", lambda update, context: start_quiz(update, context, marathon=True)))
+    application.add_handler(CommandHandler("skip", skip_question))
+    application.add_handler(CommandHandler("pause", pause_quiz))
+    application.add_handler(CommandHandler("resume", resume_quiz))
+    application.add_handler(CommandHandler("end", end_quiz))
+    application.add_handler(CommandHandler("search", search_quizzes))
+    application.add_handler(CommandHandler("view", view_quiz_details))
+    application.add_handler(CommandHandler("report", generate_report))
     
     # Admin command handlers
     if owner_id:
-        dp.add_handler(CommandHandler("admin", admin_dashboard))
-        dp.add_handler(CommandHandler("ban", ban_user))
-        dp.add_handler(CommandHandler("unban", unban_user))
-        dp.add_handler(CommandHandler("setadmin", set_admin))
+        application.add_handler(CommandHandler("admin", admin_dashboard))
+        application.add_handler(CommandHandler("ban", ban_user))
+        application.add_handler(CommandHandler("unban", unban_user))
+        application.add_handler(CommandHandler("setadmin", set_admin))
     
     # Quiz creation conversation handler
     create_quiz_conv_handler = ConversationHandler(
-        entry_points=[CommandHandler("create", create_quiz)],
+        entry_points=[
+            CommandHandler("create", create_quiz),
+            # The "Create Quiz" button of /start enters the conversation too
+            CallbackQueryHandler(create_quiz, pattern="^create_quiz$"),
+        ],
         states={
             # ... conversation states would go here
         },
         fallbacks=[CommandHandler("cancel", cancel_operation)]
     )
-    dp.add_handler(create_quiz_conv_handler)
+    application.add_handler(create_quiz_conv_handler)
     
     # Quiz editing conversation handler
     edit_quiz_conv_handler = ConversationHandler(
@@ -84,7 +175,7 @@ def initialize_bot():
         },
         fallbacks=[CommandHandler("cancel", cancel_operation)]
     )
-    dp.add_handler(edit_quiz_conv_handler)
+    application.add_handler(edit_quiz_conv_handler)
     
     # Poll conversion conversation handler
     poll_conv_handler = ConversationHandler(
@@ -94,53 +185,133 @@ def initialize_bot():
         },
         fallbacks=[CommandHandler("cancel", cancel_operation)]
     )
-    dp.add_handler(poll_conv_handler)
+    application.add_handler(poll_conv_handler)
     
     # Handler for callback queries from inline keyboards
-    dp.add_handler(CallbackQueryHandler(handle_button_press))
+    # ("create_quiz" is an entry point of create_quiz_conv_handler above)
+    CALLBACK_ROUTES.update({
+        "quiz": lambda update, context, arg: list_quizzes(update, context),
+        "profile": lambda update, context, arg: user_profile(update, context),
+    })
+    application.add_handler(CallbackQueryHandler(handle_button_press))
     
     # Handler for forwarded polls
-    dp.add_handler(MessageHandler(Filters.poll, handle_poll))
+    application.add_handler(MessageHandler(filters.POLL, handle_poll))
     
     # Handler for PDF files
-    dp.add_handler(MessageHandler(Filters.document.mime_type("application/pdf"), handle_pdf_file))
+    application.add_handler(MessageHandler(filters.Document.MimeType("application/pdf"), handle_pdf_file))
     
     # Handler for text messages that aren't commands
-    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_text_message))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
     
     # Register error handler
-    dp.add_error_handler(error_handler)
+    application.add_error_handler(error_handler)
     
     # Log bot configuration
     logger.info("Bot is running with the following configuration:")
-    logger.info(f"- API ID: {'Set' if telegram_api_id else 'Not set'}")
-    logger.info(f"- API Hash: {'Set' if telegram_api_hash else 'Not set'}")
-    logger.info(f"- Owner ID: {'Set' if owner_id else 'Not set'}")
+    logger.info("- API ID: %s", 'Set' if telegram_api_id else 'Not set')
+    logger.info("- API Hash: %s", 'Set' if telegram_api_hash else 'Not set')
+    logger.info("- Owner ID: %s", 'Set' if owner_id else 'Not set')
     
-    return updater
+    return application
 
 
-def start_command(update: Update, context: CallbackContext):
-    """Handle the /start command"""
+async def post_init(application: Application):
+    """Start background services once the bot is initialized"""
+    # asyncio.to_thread() uses the default executor, size it for the connection pool
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=DB_EXECUTOR_THREADS, thread_name_prefix="db")
+    )
+    await send_queue.start(application.bot)
+    await analytics_buffer.start()
+    if session_store:
+        await session_store.start()
+
+
+async def post_shutdown(application: Application):
+    """Stop background services when the bot shuts down"""
+    await send_queue.stop()
+    await analytics_buffer.stop()
+    if session_store:
+        await session_store.stop()
+
+
+def invalidate_cached_user(telegram_id):
+    """Drop a cached user, e.g. after they are banned or their admin flag changes"""
+    USER_CACHE.pop(telegram_id, None)
+
+
+# Dialects supporting INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+def _get_or_register_user(user):
+    """Return (id, is_admin) of the Telegram user, registering them if needed.
+
+    Runs blocking SQLAlchemy calls, so it must be executed in a worker thread.
+    """
     from app import app
     
     # Use Flask application context
     with app.app_context():
-        user = update.effective_user
-        chat_id = update.effective_chat.id
-        
-        try:
+        insert = UPSERT_INSERTS.get(db.engine.dialect.name)
+        if insert is None:
             # Register user if not already registered
             db_user = User.query.filter_by(telegram_id=user.id).first()
             if not db_user:
                 db_user = register_user(user)
-            
-            # Update last active time
-            db_user.last_active = datetime.utcnow()
-            db.session.commit()
-        except Exception as e:
-            logger.error(f"Error in start_command: {e}")
-            update.message.reply_text("Sorry, there was a database error. Please try again later.")
+            return db_user.id, db_user.is_admin
+        
+        # Register or touch the user in a single round-trip
+        now = datetime.utcnow()
+        stmt = insert(User).values(
+            telegram_id=user.id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            is_admin=False,
+            created_at=now,
+            last_active=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={"last_active": stmt.excluded.last_active}
+        ).returning(User.id, User.is_admin)
+        
+        user_id, is_admin = db.session.execute(stmt).one()
+        db.session.commit()
+        return user_id, is_admin
+
+
+async def get_cached_user(user):
+    """Return (id, is_admin) of the Telegram user, hitting the database only on a cache miss"""
+    cached_user = USER_CACHE.get(user.id)
+    if cached_user is None:
+        cached_user = await asyncio.to_thread(_get_or_register_user, user)
+        USER_CACHE[user.id] = cached_user
+    return cached_user
+
+
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle the /start command"""
+    user = update.effective_user
+    chat_id = update.effective_chat.id
+    user_id = None
+    # Queued replies are sent with send_message, keep them threaded under the command
+    reply_to = reply_to_kwargs(update.effective_message)
+    
+    try:
+        user_id, _ = await get_cached_user(user)
+        analytics_buffer.touch_user(user_id)
+    except Exception as e:
+        logger.error("Error in start_command: %s", e)
+        await send_queue.enqueue(chat_id, "reply_text", {
+            "text": "Sorry, there was a database error. Please try again later.",
+            **reply_to
+        })
     
     # Send welcome message
     welcome_text = (
@@ -161,18 +332,32 @@ def start_command(update: Update, context: CallbackContext):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    update.message.reply_text(welcome_text, reply_markup=reply_markup)
+    await send_queue.enqueue(chat_id, "reply_text", {
+        "text": welcome_text,
+        "reply_markup": reply_markup,
+        **reply_to
+    })
     
     # Log analytics
-    analytics = Analytics(
-        date=datetime.utcnow(),
-        user_id=db_user.id,
-        chat_id=chat_id,
-        event_type="bot_start",
-        event_data={}
-    )
-    db.session.add(analytics)
-    db.session.commit()
+    if user_id is not None:
+        analytics_buffer.put_nowait({
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "event_type": "bot_start"
+        })
+
+async def handle_button_press(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Dispatch inline keyboard presses by their callback data prefix"""
+    query = update.callback_query
+    prefix, _, arg = query.data.partition("_")
+    
+    handler = CALLBACK_ROUTES.get(prefix)
+    await query.answer()
+    if handler is None:
+        logger.warning("Unhandled callback data: %s", query.data)
+        return
+    
+    await handler(update, context, arg)
 
 # ... Additional bot handlers would go here ...
 
@@ -180,21 +365,11 @@ def start_bot():
     """Start the Telegram bot"""
     try:
         # Initialize and start the bot
-        updater = initialize_bot()
-        
-        # Start the Bot
-        updater.start_polling()
-        logger.info("Bot started successfully!")
+        application = initialize_bot()
         
         # Run the bot until you press Ctrl-C
-        updater.idle()
+        logger.info("Bot started successfully!")
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
     except Exception as e:
-        logger.error(f"Error starting bot: {e}")
+        logger.error("Error starting bot: %s", e)
         raise
-
-def run_bot_thread():
-    """Run the bot in a separate thread"""
-    try:
-        start_bot()
-    except Exception as e:
-        logger.error(f"Bot thread error: {e}")
@@ -1,8 +1,8 @@
 import os
-from dotenv import load_dotenv
+from utils.env_cache import load_env_fast
 
 # Load environment variables from .env file
-load_dotenv()
+load_env_fast()
 
 # Telegram Bot Configuration
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
@@ -13,6 +13,9 @@ OWNER_ID = os.environ.get('OWNER_ID')
 # Database Configuration
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
+# Redis Configuration (live quiz session state)
+REDIS_URL = os.environ.get('REDIS_URL')
+
 # Web App Configuration
 WEB_APP_URL = os.environ.get('WEB_APP_URL', 'http://localhost:5000')
 PORT = int(os.environ.get('PORT', 5000))
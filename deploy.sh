@@ -88,7 +88,7 @@ koyeb service create web \
   --git github.com/yourusername/advanced-quiz-bot \
   --git-branch main \
   --git-build-command "pip install -r requirements-koyeb.txt" \
-  --git-run-command "gunicorn --bind 0.0.0.0:\$PORT --timeout 120 main:app" \
+  --git-run-command "alembic upgrade head && python main.py" \
   --ports 80:http:\$PORT \
   --routes /:80 \
   --env TELEGRAM_BOT_TOKEN=$TELEGRAM_BOT_TOKEN \
@@ -97,6 +97,7 @@ koyeb service create web \
   --env SESSION_SECRET=$SESSION_SECRET \
   --env WEB_APP_URL=https://$APP_NAME.koyeb.app \
   --env PORT=\$PORT \
+  --env DOTENV_SKIP=1 \
   --health-check /health:80 \
   --min-scale 1 \
   --max-scale 1
@@ -5,21 +5,23 @@ This script can be run to verify the health of the application components.
 
 import os
 import sys
+import asyncio
 import logging
-import requests
-from dotenv import load_dotenv
+import httpx
+from utils.env_cache import load_env_fast
+from utils.log_format import configure_logging
 
 # Load environment variables
-load_dotenv()
+load_env_fast()
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-def check_environment_variables():
+# Timeout for each HTTP check, in seconds
+HTTP_TIMEOUT = 10
+
+async def check_environment_variables():
     """Check if all required environment variables are set"""
     required_vars = [
         'TELEGRAM_BOT_TOKEN',
@@ -33,13 +35,13 @@ def check_environment_variables():
             missing_vars.append(var)
     
     if missing_vars:
-        logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.error("Missing required environment variables: %s", ', '.join(missing_vars))
         return False
     
     logger.info("All required environment variables are set")
     return True
 
-def check_telegram_bot():
+async def check_telegram_bot(client):
     """Check if the Telegram bot token is valid"""
     bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
     if not bot_token:
@@ -47,70 +49,83 @@ def check_telegram_bot():
         return False
     
     try:
-        response = requests.get(f"https://api.telegram.org/bot{bot_token}/getMe")
+        response = await client.get(f"https://api.telegram.org/bot{bot_token}/getMe")
         if response.status_code == 200:
             bot_info = response.json()
             if bot_info.get('ok'):
-                logger.info(f"Bot check successful: @{bot_info['result']['username']}")
+                logger.info("Bot check successful: @%s", bot_info['result']['username'])
                 return True
             else:
-                logger.error(f"Bot token is invalid: {bot_info.get('description')}")
+                logger.error("Bot token is invalid: %s", bot_info.get('description'))
                 return False
         else:
-            logger.error(f"Failed to connect to Telegram API: {response.status_code}")
+            logger.error("Failed to connect to Telegram API: %s", response.status_code)
             return False
     except Exception as e:
-        logger.error(f"Error checking Telegram bot: {e}")
+        logger.error("Error checking Telegram bot: %s", e)
         return False
 
-def check_database():
+def _connect_database():
+    from app import app, db
+    with app.app_context():
+        with db.engine.connect():
+            pass
+
+async def check_database():
     """Check if the database connection is working"""
     try:
-        from app import app, db
-        with app.app_context():
-            db.engine.connect()
-            logger.info("Database connection successful")
-            return True
+        # Importing the app and connecting are blocking, keep them off the event loop
+        await asyncio.to_thread(_connect_database)
+        logger.info("Database connection successful")
+        return True
     except Exception as e:
-        logger.error(f"Database connection failed: {e}")
+        logger.error("Database connection failed: %s", e)
         return False
 
-def check_web_server():
+async def check_web_server(client):
     """Check if the web server is running"""
     web_app_url = os.environ.get('WEB_APP_URL', 'http://localhost:5000')
     health_endpoint = f"{web_app_url}/health"
     
     try:
-        response = requests.get(health_endpoint)
+        response = await client.get(health_endpoint)
         if response.status_code == 200:
             logger.info("Web server is running")
             return True
         else:
-            logger.error(f"Web server check failed: {response.status_code}")
+            logger.error("Web server check failed: %s", response.status_code)
             return False
     except Exception as e:
-        logger.error(f"Error checking web server: {e}")
+        logger.error("Error checking web server: %s", e)
         return False
 
-def main():
-    """Run all health checks"""
+async def run_checks():
+    """Run all health checks concurrently"""
     logger.info("Starting application health check...")
     
-    env_check = check_environment_variables()
-    bot_check = check_telegram_bot()
-    db_check = check_database()
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        checks = [
+            check_environment_variables(),
+            check_telegram_bot(client),
+            check_database(),
+        ]
+        
+        # Only check web server if we're not in standalone bot mode
+        if os.environ.get('WEB_APP_URL'):
+            checks.append(check_web_server(client))
+        
+        results = await asyncio.gather(*checks, return_exceptions=True)
     
-    # Only check web server if we're not in standalone bot mode
-    web_check = True
-    if os.environ.get('WEB_APP_URL'):
-        web_check = check_web_server()
-    
-    if env_check and bot_check and db_check and web_check:
+    if all(result is True for result in results):
         logger.info("All health checks passed!")
         return 0
     else:
         logger.error("One or more health checks failed")
         return 1
 
+def main():
+    """Run all health checks"""
+    return asyncio.run(run_checks())
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -1,18 +1,22 @@
 import os
-import threading
-from dotenv import load_dotenv
+import asyncio
+from utils.env_cache import load_env_fast
+
+# Load environment variables before importing anything that reads them
+load_env_fast()
+
+from asgiref.wsgi import WsgiToAsgi
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from telegram import Update
 from app import app
-from bot import run_bot_thread
+from bot import initialize_bot, post_init, post_shutdown
+from utils.analytics_daily import start_analytics_refresh
+from utils.log_format import configure_logging
 import logging
 
-# Load environment variables
-load_dotenv()
-
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 def validate_telegram_credentials():
@@ -23,21 +27,45 @@ def validate_telegram_credentials():
     
     logger.info("Telegram credentials validated successfully")
 
+def create_server_config(port):
+    """Build the Hypercorn configuration for the web interface"""
+    config = Config()
+    config.bind = [f"0.0.0.0:{port}"]
+    config.workers = 1
+    config.worker_class = "asyncio"
+    return config
+
+async def run_application(port):
+    """Run the web server and the Telegram bot on a single event loop"""
+    application = initialize_bot()
+    asgi_app = WsgiToAsgi(app)
+    
+    async with application:
+        # post_init/post_shutdown are only invoked by run_polling(), call them here
+        await post_init(application)
+        logger.info("Starting Telegram bot...")
+        await application.start()
+        await application.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        
+        try:
+            # Hypercorn handles SIGINT/SIGTERM and returns on shutdown
+            logger.info("Starting web server on port %d...", port)
+            await serve(asgi_app, create_server_config(port))
+        finally:
+            logger.info("Stopping Telegram bot...")
+            await application.updater.stop()
+            await application.stop()
+            await post_shutdown(application)
+
 if __name__ == "__main__":
     try:
         validate_telegram_credentials()
         
-        # Start bot in a separate thread
-        logger.info("Starting Telegram bot thread...")
-        bot_thread = threading.Thread(target=run_bot_thread)
-        bot_thread.daemon = True
-        bot_thread.start()
+        start_analytics_refresh(app)
         
-        # Start Flask app
         port = int(os.environ.get('PORT', 5000))
-        logger.info(f"Starting Flask app on port {port}...")
-        app.run(host="0.0.0.0", port=port, debug=False)
+        asyncio.run(run_application(port))
         
     except Exception as e:
-        logger.error(f"Failed to start application: {e}")
+        logger.error("Failed to start application: %s", e)
         raise
@@ -0,0 +1,54 @@
+"""
+Alembic environment, run with `alembic upgrade head` before starting the app.
+Uses the Flask app's database configuration and model metadata.
+"""
+
+from logging.config import fileConfig
+from alembic import context
+from utils.env_cache import load_env_fast
+
+# DATABASE_URL may come from .env, load it before the app reads it
+load_env_fast()
+
+from app import app, db  # noqa: E402
+
+config = context.config
+
+# Set when run from code (standalone.setup_database) with an open connection,
+# the caller has configured logging already
+external_connection = config.attributes.get("connection")
+if config.config_file_name is not None and external_connection is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = db.metadata
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting to the database"""
+    context.configure(
+        url=app.config["SQLALCHEMY_DATABASE_URI"],
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """Run the migrations against the configured database"""
+    if external_connection is not None:
+        # Runs inside the caller's transaction
+        context.configure(connection=external_connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    
+    with app.app_context():
+        with db.engine.connect() as connection:
+            context.configure(connection=connection, target_metadata=target_metadata)
+            with context.begin_transaction():
+                context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
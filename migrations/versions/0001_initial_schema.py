@@ -0,0 +1,131 @@
+"""initial schema
+
+The schema as created by db.create_all() before the project used migrations.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases created by create_all() before migrations already have this schema
+    if not context.is_offline_mode() and 'users' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('telegram_id', sa.Integer(), nullable=False, unique=True),
+        sa.Column('username', sa.String(64), nullable=True),
+        sa.Column('first_name', sa.String(64), nullable=True),
+        sa.Column('last_name', sa.String(64), nullable=True),
+        sa.Column('is_admin', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_active', sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        'quizzes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(256), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('creator_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('is_public', sa.Boolean(), nullable=True),
+        sa.Column('is_paid', sa.Boolean(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('time_limit', sa.Integer(), nullable=True),
+        sa.Column('allow_negative_marking', sa.Boolean(), nullable=True),
+        sa.Column('negative_marking_factor', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('tags', sa.String(256), nullable=True),
+        sa.Column('sections', sa.JSON(), nullable=True),
+    )
+
+    op.create_table(
+        'questions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('quiz_id', sa.Integer(), sa.ForeignKey('quizzes.id'), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('options', sa.JSON(), nullable=False),
+        sa.Column('correct_option', sa.Integer(), nullable=False),
+        sa.Column('explanation', sa.Text(), nullable=True),
+        sa.Column('points', sa.Integer(), nullable=True),
+        sa.Column('section', sa.String(64), nullable=True),
+        sa.Column('order', sa.Integer(), nullable=True),
+    )
+
+    op.create_table(
+        'quiz_attempts',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('quiz_id', sa.Integer(), sa.ForeignKey('quizzes.id'), nullable=False),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('max_score', sa.Float(), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=True),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('is_completed', sa.Boolean(), nullable=True),
+        sa.Column('section_scores', sa.JSON(), nullable=True),
+    )
+
+    op.create_table(
+        'answers',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('attempt_id', sa.Integer(), sa.ForeignKey('quiz_attempts.id'), nullable=False),
+        sa.Column('question_id', sa.Integer(), sa.ForeignKey('questions.id'), nullable=False),
+        sa.Column('selected_option', sa.Integer(), nullable=True),
+        sa.Column('is_correct', sa.Boolean(), nullable=True),
+        sa.Column('answer_time', sa.DateTime(), nullable=True),
+        sa.Column('time_taken', sa.Integer(), nullable=True),
+    )
+
+    op.create_table(
+        'chat_groups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('telegram_chat_id', sa.Integer(), nullable=False, unique=True),
+        sa.Column('title', sa.String(256), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_active', sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        'quiz_sessions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('quiz_id', sa.Integer(), sa.ForeignKey('quizzes.id'), nullable=False),
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('current_question_index', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_paused', sa.Boolean(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('marathon_mode', sa.Boolean(), nullable=True),
+    )
+
+    op.create_table(
+        'analytics',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('quiz_id', sa.Integer(), sa.ForeignKey('quizzes.id'), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('chat_id', sa.Integer(), nullable=True),
+        sa.Column('event_type', sa.String(64), nullable=False),
+        sa.Column('event_data', sa.JSON(), nullable=True),
+    )
+
+def downgrade():
+    op.drop_table('analytics')
+    op.drop_table('quiz_sessions')
+    op.drop_table('chat_groups')
+    op.drop_table('answers')
+    op.drop_table('quiz_attempts')
+    op.drop_table('questions')
+    op.drop_table('quizzes')
+    op.drop_table('users')
@@ -0,0 +1,61 @@
+"""indexes, jsonb columns and analytics_daily
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# Copied here so later changes to utils/analytics_daily.py don't rewrite this revision.
+# The unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+ANALYTICS_DAILY_DDL = [
+    "CREATE MATERIALIZED VIEW IF NOT EXISTS analytics_daily AS "
+    "SELECT date_trunc('day', date) AS day, event_type, count(*) AS events "
+    "FROM analytics GROUP BY 1, 2",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_analytics_daily_day_event "
+    "ON analytics_daily (day, event_type)",
+]
+
+def upgrade():
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+
+    # IF NOT EXISTS, the tables may have been created from the current models (standalone.py)
+    op.create_index('ix_quiz_creator', 'quizzes', ['creator_id'], if_not_exists=True)
+    op.create_index('ix_quiz_public_created', 'quizzes', ['is_public', 'created_at', 'id'], if_not_exists=True)
+    op.create_index('ix_attempt_user_completed_end', 'quiz_attempts', ['user_id', 'is_completed', 'end_time'],
+                    if_not_exists=True)
+    op.create_index('ix_attempt_quiz_completed', 'quiz_attempts', ['quiz_id', 'is_completed'], if_not_exists=True)
+    op.create_index('ix_analytics_date_event', 'analytics', ['date', 'event_type'], if_not_exists=True)
+    op.create_index('ix_analytics_event_type_date', 'analytics', ['event_type', 'date'], if_not_exists=True)
+
+    if not is_postgresql:
+        return
+
+    op.execute("ALTER TABLE quizzes ALTER COLUMN sections TYPE jsonb USING sections::jsonb")
+    op.execute("ALTER TABLE analytics ALTER COLUMN event_data TYPE jsonb USING event_data::jsonb")
+    op.create_index('ix_analytics_event_data_gin', 'analytics', ['event_data'], postgresql_using='gin',
+                    if_not_exists=True)
+
+    for statement in ANALYTICS_DAILY_DDL:
+        op.execute(statement)
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP MATERIALIZED VIEW IF EXISTS analytics_daily")
+        op.drop_index('ix_analytics_event_data_gin', table_name='analytics')
+        op.execute("ALTER TABLE analytics ALTER COLUMN event_data TYPE json USING event_data::json")
+        op.execute("ALTER TABLE quizzes ALTER COLUMN sections TYPE json USING sections::json")
+
+    op.drop_index('ix_analytics_event_type_date', table_name='analytics')
+    op.drop_index('ix_analytics_date_event', table_name='analytics')
+    op.drop_index('ix_attempt_quiz_completed', table_name='quiz_attempts')
+    op.drop_index('ix_attempt_user_completed_end', table_name='quiz_attempts')
+    op.drop_index('ix_quiz_public_created', table_name='quizzes')
+    op.drop_index('ix_quiz_creator', table_name='quizzes')
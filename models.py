@@ -1,9 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, Text, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, Text, ForeignKey, Index, JSON, and_, case, func, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import column_property, relationship
 from app import db
 from flask_login import UserMixin
 
+# Binary JSON on PostgreSQL (parsed once on write, indexable), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+
 class User(UserMixin, db.Model):
     """User model representing Telegram users of the bot"""
     __tablename__ = 'users'
@@ -26,6 +31,10 @@ class User(UserMixin, db.Model):
 class Quiz(db.Model):
     """Quiz model containing quiz metadata and settings"""
     __tablename__ = 'quizzes'
+    __table_args__ = (
+        Index('ix_quiz_creator', 'creator_id'),
+        Index('ix_quiz_public_created', 'is_public', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(256), nullable=False)
@@ -40,32 +49,25 @@ class Quiz(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     tags = Column(String(256), nullable=True)
-    sections = Column(JSON, default={})  # For organizing questions into sections
+    sections = Column(JSONType, default=dict)  # For organizing questions into sections
     
     creator = relationship('User', back_populates='created_quizzes')
     questions = relationship('Question', back_populates='quiz', cascade="all, delete-orphan")
     attempts = relationship('QuizAttempt', back_populates='quiz', cascade="all, delete-orphan")
     
     def __repr__(self):
-        return f"<Quiz id={self.id} title={self.title} questions={len(self.questions)}>"
+        return f"<Quiz id={self.id} title={self.title} questions={self.question_count}>"
     
     def get_total_questions(self):
         return len(self.questions)
     
     def get_average_score(self):
-        if not self.attempts:
-            return 0
-        
-        completed_attempts = [a for a in self.attempts if a.is_completed]
-        if not completed_attempts:
-            return 0
-        
-        total_percentage = 0
-        for attempt in completed_attempts:
-            if attempt.max_score > 0:
-                total_percentage += (attempt.score / attempt.max_score) * 100
-        
-        return total_percentage / len(completed_attempts)
+        # Attempts without a max score count as 0%, like the other completed attempts
+        average = db.session.query(func.avg(QuizAttempt.percentage)).filter(
+            QuizAttempt.quiz_id == self.id,
+            QuizAttempt.is_completed == True
+        ).scalar()
+        return average or 0
 
 class Question(db.Model):
     """Question model representing individual quiz questions"""
@@ -87,9 +89,23 @@ class Question(db.Model):
     def __repr__(self):
         return f"<Question id={self.id} quiz_id={self.quiz_id}>"
 
+# Number of questions, computed by the database instead of loading Quiz.questions.
+# Deferred so the subquery is only added to the queries that undefer() it.
+Quiz.question_count = column_property(
+    select(func.count(Question.id))
+    .where(Question.quiz_id == Quiz.id)
+    .correlate_except(Question)
+    .scalar_subquery(),
+    deferred=True
+)
+
 class QuizAttempt(db.Model):
     """Model for tracking user's quiz attempts"""
     __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        Index('ix_attempt_user_completed_end', 'user_id', 'is_completed', 'end_time'),
+        Index('ix_attempt_quiz_completed', 'quiz_id', 'is_completed'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -108,26 +124,62 @@ class QuizAttempt(db.Model):
     def __repr__(self):
         return f"<QuizAttempt id={self.id} user_id={self.user_id} quiz_id={self.quiz_id} score={self.score}/{self.max_score}>"
     
+    @hybrid_property
+    def percentage(self):
+        """Score as a percentage of the max score (0 when there is no max score)"""
+        if self.max_score > 0:
+            return (self.score / self.max_score) * 100
+        return 0
+    
+    @percentage.expression
+    def percentage(cls):
+        return case((cls.max_score > 0, cls.score * 100 / cls.max_score), else_=0)
+    
     def calculate_score(self):
         """Calculates the score for this attempt"""
-        total_score = 0
-        max_possible = 0
+        # Apply negative marking if enabled
+        negative_factor = 0
+        if self.quiz.allow_negative_marking:
+            negative_factor = self.quiz.negative_marking_factor
+        
+        # The query is bound to self.id, which a new attempt only gets when it's flushed
+        if self.id is None:
+            db.session.flush()
         
-        for answer in self.answers:
-            question = answer.question
-            max_possible += question.points
-            
-            if answer.is_correct:
-                total_score += question.points
-            elif self.quiz.allow_negative_marking:
-                # Apply negative marking if enabled
-                penalty = question.points * self.quiz.negative_marking_factor
-                total_score -= penalty
+        points = func.coalesce(Question.points, 0)
+        score_query = (
+            select(
+                func.coalesce(func.sum(case((Answer.is_correct, points), else_=-points * negative_factor)), 0),
+                func.coalesce(func.sum(points), 0)
+            )
+            .select_from(Answer)
+            .join(Question, Answer.question_id == Question.id)
+            .where(Answer.attempt_id == self.id)
+        )
+        total_score, max_possible = db.session.execute(score_query).one()
         
         self.score = total_score
         self.max_score = max_possible
         return total_score
 
+_completed_attempts = and_(QuizAttempt.quiz_id == Quiz.id, QuizAttempt.is_completed == True)
+
+# Attempt statistics, deferred so they're only queried when explicitly requested
+Quiz.completed_attempt_count = column_property(
+    select(func.count(QuizAttempt.id))
+    .where(_completed_attempts)
+    .correlate_except(QuizAttempt)
+    .scalar_subquery(),
+    deferred=True
+)
+Quiz.average_score = column_property(
+    select(func.coalesce(func.avg(QuizAttempt.percentage), 0))
+    .where(_completed_attempts)
+    .correlate_except(QuizAttempt)
+    .scalar_subquery(),
+    deferred=True
+)
+
 class Answer(db.Model):
     """Model to store user's answers to questions"""
     __tablename__ = 'answers'
@@ -181,6 +233,12 @@ class QuizSession(db.Model):
 class Analytics(db.Model):
     """Model for storing analytics data"""
     __tablename__ = 'analytics'
+    __table_args__ = (
+        Index('ix_analytics_date_event', 'date', 'event_type'),
+        Index('ix_analytics_event_type_date', 'event_type', 'date'),
+        # Only useful for JSONB, elsewhere it would be a btree over the JSON text
+        Index('ix_analytics_event_data_gin', 'event_data', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
     
     id = Column(Integer, primary_key=True)
     date = Column(DateTime, default=datetime.utcnow)
@@ -188,7 +246,7 @@ class Analytics(db.Model):
     user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     chat_id = Column(Integer, nullable=True)
     event_type = Column(String(64), nullable=False)  # e.g., "quiz_start", "question_answer", "quiz_complete"
-    event_data = Column(JSON, default={})
+    event_data = Column(JSONType, default=dict)
     
     quiz = relationship('Quiz')
     user = relationship('User')
@@ -1,10 +1,115 @@
-from flask import render_template, request, redirect, url_for, jsonify, flash
+import csv
+import hashlib
+import io
+import re
+import threading
+from datetime import datetime
+from cachetools import TTLCache, cached
+from flask import render_template, request, redirect, url_for, jsonify, flash, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy import event, func, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload, undefer
 from models import User, Quiz, Question, QuizAttempt, Analytics
 from app import db
 from utils.analytics import get_user_stats, get_quiz_stats, get_global_analytics
+from utils.analytics_daily import get_daily_event_counts
 from utils.report_generator import generate_quiz_report, generate_user_report, export_quiz_results
 
+# Short lived cache for slowly changing homepage data
+stats_cache = TTLCache(maxsize=32, ttl=30)
+stats_cache_lock = threading.Lock()
+
+# Analytics are cached per requested period, kept apart so requests for many
+# different periods can't evict the homepage stats
+analytics_cache = TTLCache(maxsize=64, ttl=30)
+analytics_cache_lock = threading.Lock()
+MAX_ANALYTICS_DAYS = 365
+
+@cached(stats_cache, key=lambda: 'index_stats', lock=stats_cache_lock)
+def get_index_stats():
+    """Get the public quiz count, user count and most recent public quizzes.
+
+    The quizzes are cached as plain dicts, ORM instances would be shared
+    between requests and detached from their session.
+    """
+    recent_quizzes = db.session.execute(
+        select(Quiz.id, Quiz.title, func.coalesce(User.username, User.first_name).label('creator_name'),
+               Quiz.question_count, Quiz.created_at)
+        .join(Quiz.creator)
+        .where(Quiz.is_public == True)
+        .order_by(Quiz.created_at.desc())
+        .limit(5)
+    ).mappings().all()
+    
+    return {
+        'total_quizzes': Quiz.query.filter_by(is_public=True).count(),
+        'total_users': User.query.count(),
+        'recent_quizzes': [dict(quiz) for quiz in recent_quizzes]
+    }
+
+def get_analytics_days():
+    """The analytics period requested by the client, limited to MAX_ANALYTICS_DAYS"""
+    days = request.args.get('days', 30, type=int)
+    return min(max(days, 1), MAX_ANALYTICS_DAYS)
+
+@cached(analytics_cache, key=lambda days: ('global_analytics', days), lock=analytics_cache_lock)
+def get_cached_global_analytics(days):
+    """Get global analytics for the given number of days"""
+    return get_global_analytics(days)
+
+@cached(analytics_cache, key=lambda days: ('daily_events', days), lock=analytics_cache_lock)
+def get_cached_daily_event_counts(days):
+    """Get per-day event counts for the given number of days"""
+    return get_daily_event_counts(days)
+
+@event.listens_for(Quiz, 'after_insert')
+def invalidate_index_stats(mapper, connection, target):
+    """Drop the cached homepage stats when a quiz is created"""
+    with stats_cache_lock:
+        stats_cache.pop('index_stats', None)
+
+# Rows fetched per round-trip when streaming reports
+REPORT_BATCH_SIZE = 500
+CSV_CHUNK_SIZE = 16 * 1024
+
+def stream_csv(filename, header, statement):
+    """Stream the rows of a query as a CSV download without loading them all at once"""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        
+        for row in db.session.execute(statement.execution_options(yield_per=REPORT_BATCH_SIZE)):
+            writer.writerow(row)
+            if buffer.tell() >= CSV_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        yield buffer.getvalue()
+    
+    return Response(stream_with_context(generate()),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+# Flask-Compress sends compressed responses with the ETag "<etag>:<encoding>"
+COMPRESSED_ETAG_SUFFIX = re.compile(r':(?:gzip|br|deflate|zstd)"')
+
+def json_response(payload, max_age=None):
+    """Build a JSON response with an ETag, answering 304 when the client's copy is current"""
+    response = jsonify(payload)
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=16).hexdigest())
+    if max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    
+    # Compare against the uncompressed ETag the client's copy was derived from
+    environ = request.environ
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        environ = dict(environ, HTTP_IF_NONE_MATCH=COMPRESSED_ETAG_SUFFIX.sub('"', if_none_match))
+    return response.make_conditional(environ)
+
 def register_routes(app):
     """Register all routes with the Flask app"""
     
@@ -15,22 +120,22 @@ def register_routes(app):
     @app.route('/')
     def index():
         """Homepage route"""
-        total_quizzes = Quiz.query.filter_by(is_public=True).count()
-        total_users = User.query.count()
-        recent_quizzes = Quiz.query.filter_by(is_public=True).order_by(Quiz.created_at.desc()).limit(5).all()
+        stats = get_index_stats()
         
         return render_template('index.html', 
-                            total_quizzes=total_quizzes,
-                            total_users=total_users,
-                            recent_quizzes=recent_quizzes)
+                            total_quizzes=stats['total_quizzes'],
+                            total_users=stats['total_users'],
+                            recent_quizzes=stats['recent_quizzes'])
     
     @app.route('/dashboard')
     @login_required
     def dashboard():
         """Dashboard route for logged-in users"""
         user_stats = get_user_stats(current_user.id)
-        created_quizzes = Quiz.query.filter_by(creator_id=current_user.id).all()
-        recent_attempts = QuizAttempt.query.filter_by(
+        created_quizzes = Quiz.query.options(selectinload(Quiz.questions)).filter_by(
+            creator_id=current_user.id
+        ).all()
+        recent_attempts = QuizAttempt.query.options(joinedload(QuizAttempt.quiz)).filter_by(
             user_id=current_user.id,
             is_completed=True
         ).order_by(QuizAttempt.end_time.desc()).limit(5).all()
@@ -44,36 +149,53 @@ def register_routes(app):
     @app.route('/quizzes')
     def quizzes():
         """List all public quizzes"""
-        page = request.args.get('page', 1, type=int)
+        # Keyset pagination: the next page starts after the last quiz shown
+        after = request.args.get('after', type=datetime.fromisoformat)
+        after_id = request.args.get('after_id', type=int)
         per_page = 10
         
-        quizzes = Quiz.query.filter_by(is_public=True).order_by(
-            Quiz.created_at.desc()
-        ).paginate(page=page, per_page=per_page)
+        query = Quiz.query.options(undefer(Quiz.question_count)).filter(Quiz.is_public == True)
+        if after is not None and after_id is not None:
+            query = query.filter(tuple_(Quiz.created_at, Quiz.id) < (after, after_id))
+        
+        # Fetch one extra row to know whether there is a next page
+        page = query.order_by(Quiz.created_at.desc(), Quiz.id.desc()).limit(per_page + 1).all()
+        quizzes = page[:per_page]
         
-        return render_template('quizzes.html', quizzes=quizzes)
+        next_page = None
+        if len(page) > per_page:
+            last = quizzes[-1]
+            next_page = url_for('quizzes', after=last.created_at.isoformat(), after_id=last.id)
+        
+        return render_template('quizzes.html', quizzes=quizzes, next_page=next_page)
     
     @app.route('/quiz/<int:quiz_id>')
     def quiz_details(quiz_id):
         """Show details for a specific quiz"""
-        quiz = Quiz.query.get_or_404(quiz_id)
-        creator = User.query.get(quiz.creator_id)
-        
-        total_attempts = QuizAttempt.query.filter_by(quiz_id=quiz_id, is_completed=True).count()
-        avg_score = quiz.get_average_score()
+        # Load the quiz, its creator and the attempt statistics in a single query
+        quiz = db.first_or_404(
+            select(Quiz)
+            .options(
+                joinedload(Quiz.creator),
+                undefer(Quiz.question_count),
+                undefer(Quiz.completed_attempt_count),
+                undefer(Quiz.average_score)
+            )
+            .where(Quiz.id == quiz_id)
+        )
         
         return render_template('quiz_details.html',
                             quiz=quiz,
-                            creator=creator,
-                            total_attempts=total_attempts,
-                            avg_score=avg_score)
+                            creator=quiz.creator,
+                            total_attempts=quiz.completed_attempt_count,
+                            avg_score=quiz.average_score)
     
     @app.route('/reports')
     @login_required
     def reports():
         """Show available reports"""
         user_quizzes = Quiz.query.filter_by(creator_id=current_user.id).all()
-        attempted_quizzes = QuizAttempt.query.filter_by(
+        attempted_quizzes = QuizAttempt.query.options(joinedload(QuizAttempt.quiz)).filter_by(
             user_id=current_user.id,
             is_completed=True
         ).all()
@@ -93,6 +215,19 @@ def register_routes(app):
             flash('You do not have permission to view this report.')
             return redirect(url_for('quizzes'))
         
+        if request.args.get('format') == 'csv':
+            return stream_csv(
+                f'quiz_{quiz_id}_report.csv',
+                ['attempt_id', 'user_id', 'username', 'score', 'max_score', 'start_time', 'end_time'],
+                select(
+                    QuizAttempt.id, User.id, User.username, QuizAttempt.score,
+                    QuizAttempt.max_score, QuizAttempt.start_time, QuizAttempt.end_time
+                )
+                .join(User, QuizAttempt.user_id == User.id)
+                .where(QuizAttempt.quiz_id == quiz_id, QuizAttempt.is_completed == True)
+                .order_by(QuizAttempt.end_time)
+            )
+        
         report_data = generate_quiz_report(quiz_id)
         
         return render_template('report_template.html',
@@ -111,6 +246,19 @@ def register_routes(app):
             flash('You do not have permission to view this report.')
             return redirect(url_for('dashboard'))
         
+        if request.args.get('format') == 'csv':
+            return stream_csv(
+                f'user_{user_id}_report.csv',
+                ['attempt_id', 'quiz_id', 'quiz_title', 'score', 'max_score', 'start_time', 'end_time'],
+                select(
+                    QuizAttempt.id, Quiz.id, Quiz.title, QuizAttempt.score,
+                    QuizAttempt.max_score, QuizAttempt.start_time, QuizAttempt.end_time
+                )
+                .join(Quiz, QuizAttempt.quiz_id == Quiz.id)
+                .where(QuizAttempt.user_id == user_id, QuizAttempt.is_completed == True)
+                .order_by(QuizAttempt.end_time)
+            )
+        
         report_data = generate_user_report(user_id)
         
         return render_template('report_template.html',
@@ -123,20 +271,24 @@ def register_routes(app):
     def api_quiz_stats(quiz_id):
         """API endpoint to get quiz statistics"""
         stats = get_quiz_stats(quiz_id)
-        return jsonify(stats)
+        return json_response(stats)
     
     @app.route('/api/user/<int:user_id>/stats')
     def api_user_stats(user_id):
         """API endpoint to get user statistics"""
         stats = get_user_stats(user_id)
-        return jsonify(stats)
+        return json_response(stats)
     
     @app.route('/api/analytics')
     def api_analytics():
         """API endpoint to get global analytics"""
-        days = request.args.get('days', 30, type=int)
-        analytics = get_global_analytics(days)
-        return jsonify(analytics)
+        analytics = get_cached_global_analytics(get_analytics_days())
+        return json_response(analytics, max_age=60)
+    
+    @app.route('/api/analytics/daily')
+    def api_analytics_daily():
+        """API endpoint to get event counts per day and event type"""
+        return json_response(get_cached_daily_event_counts(get_analytics_days()), max_age=60)
     
     # Error handlers
     @app.errorhandler(404)
@@ -4,27 +4,170 @@ This can be useful for debugging or when you only need the bot functionality.
 """
 
 import os
+import hashlib
 import logging
-from dotenv import load_dotenv
-from bot import start_bot
-from app import app
-
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+import tempfile
+from utils.env_cache import load_env_fast
+from utils.log_format import configure_logging
+
+# Load environment variables before importing anything that reads them.
+# The app and bot modules are imported where they are used, see main().
+load_env_fast()
+
+# Configure logging. Process and thread info isn't in the log format, so skip
+# collecting it for every record.
+logging.logProcesses = False
+logging.logThreads = False
+configure_logging()
 logger = logging.getLogger(__name__)
 
+SCHEMA_CACHE_FILE = '.schema_cache'
+
+def get_schema_fingerprint(db):
+    """Hash the database URL and the tables, columns and indexes of the models"""
+    schema = sorted(
+        (t.name,
+         tuple((c.name, repr(c.type)) for c in t.columns),
+         tuple(sorted(i.name for i in t.indexes)))
+        for t in db.metadata.sorted_tables
+    )
+    url = db.engine.url.render_as_string(hide_password=True)
+    return hashlib.blake2b(repr((url, schema)).encode()).hexdigest()
+
+def get_schema_cache_path(db):
+    """The cache lives next to the SQLite database file, or in the instance folder"""
+    from app import app
+    
+    database = db.engine.url.database
+    if db.engine.dialect.name == 'sqlite' and database and database != ':memory:':
+        return os.path.join(os.path.dirname(os.path.abspath(database)), SCHEMA_CACHE_FILE)
+    return os.path.join(app.instance_path, SCHEMA_CACHE_FILE)
+
+def read_schema_cache(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def write_schema_cache(path, fingerprint):
+    """Write the fingerprint atomically so a crash never leaves a partial cache"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # A unique temporary file, so processes starting together don't overwrite each other's
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{SCHEMA_CACHE_FILE}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(fingerprint)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# Serializes schema setup between processes starting at the same time (PostgreSQL)
+SCHEMA_LOCK_ID = 91237
+
+def is_supported_index(index, dialect):
+    """GIN indexes (on JSONB columns) only exist on PostgreSQL"""
+    return dialect.name == 'postgresql' or index.dialect_options['postgresql']['using'] != 'gin'
+
+def create_missing_tables(conn, metadata):
+    """Create all missing tables with one batched DDL script.
+
+    Instead of create_all(), which probes and creates each table and index in
+    its own round-trip, the existing tables are listed once and the DDL for the
+    missing ones is compiled up front and sent as one script. Returns the
+    tables that were created.
+    """
+    from sqlalchemy import inspect
+    from sqlalchemy.schema import CreateIndex, CreateTable
+    from utils.analytics_daily import create_analytics_daily
+    
+    existing_tables = set(inspect(conn).get_table_names())
+    new_tables = [t for t in metadata.sorted_tables if t.name not in existing_tables]
+    if not new_tables:
+        logger.info("Database tables verified")
+        return []
+    
+    # IF NOT EXISTS keeps a concurrent setup without locking (SQLite) from failing
+    statements = []
+    for table in new_tables:
+        statements.append(str(CreateTable(table, if_not_exists=True).compile(dialect=conn.dialect)).strip())
+        for index in table.indexes:
+            if is_supported_index(index, conn.dialect):
+                statements.append(str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect)).strip())
+    
+    if conn.dialect.name == "sqlite":
+        # sqlite3 only executes one statement per call
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+    else:
+        conn.exec_driver_sql(";\n".join(statements))
+    
+    # Views built on the new tables
+    if any(t.name == 'analytics' for t in new_tables):
+        create_analytics_daily(conn)
+    
+    logger.info("Database tables created: %s", ", ".join(t.name for t in new_tables))
+    return new_tables
+
+def stamp_alembic_head(conn):
+    """Record the schema created from the models as the latest Alembic revision"""
+    from alembic import command
+    from alembic.config import Config
+    
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(base_dir, 'alembic.ini'))
+    config.set_main_option('script_location', os.path.join(base_dir, 'migrations'))
+    config.attributes['connection'] = conn
+    command.stamp(config, 'head')
+    logger.info("Database stamped with the latest migration")
+
 def setup_database():
-    """Initialize the database with all required tables"""
+    """Initialize the database with all required tables.
+
+    The DDL pass is skipped entirely when the models haven't changed since the
+    last successful run. This is recorded locally in a schema fingerprint file
+    and in the database's schema_meta table, which is checked and updated under
+    an advisory lock so concurrent workers don't race on the DDL.
+    """
+    from app import app, db
+    from sqlalchemy import text
+    
     with app.app_context():
-        from models import db
-        db.create_all()
-        logger.info("Database tables created or verified")
+        fingerprint = get_schema_fingerprint(db)
+        cache_path = get_schema_cache_path(db)
+        if read_schema_cache(cache_path) == fingerprint:
+            logger.info("Database schema unchanged, skipping table setup")
+            return
+        
+        with db.engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Released automatically when the transaction ends
+                conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": SCHEMA_LOCK_ID})
+            
+            conn.exec_driver_sql(
+                "CREATE TABLE IF NOT EXISTS schema_meta (id INTEGER PRIMARY KEY, version VARCHAR(128) NOT NULL)"
+            )
+            if conn.dialect.name == "sqlite":
+                # Take SQLite's write lock now so a concurrent setup waits for this one to commit
+                conn.exec_driver_sql("UPDATE schema_meta SET version = version WHERE id = 1")
+            version = conn.execute(text("SELECT version FROM schema_meta WHERE id = 1")).scalar()
+            if version == fingerprint:
+                logger.info("Database schema is current (set up by another process)")
+            else:
+                new_tables = create_missing_tables(conn, db.metadata)
+                if len(new_tables) == len(db.metadata.sorted_tables):
+                    # A new database, already at the latest migration. Databases
+                    # with existing tables are brought up to date by `alembic upgrade head`.
+                    stamp_alembic_head(conn)
+                conn.execute(
+                    text("INSERT INTO schema_meta (id, version) VALUES (1, :version) "
+                         "ON CONFLICT (id) DO UPDATE SET version = excluded.version"),
+                    {"version": fingerprint}
+                )
+        
+        write_schema_cache(cache_path, fingerprint)
 
 def main():
     """Run the Telegram bot as a standalone application"""
@@ -33,11 +176,13 @@ def main():
         setup_database()
         
         # Start the bot
+        from bot import start_bot
         logger.info("Starting Telegram bot in standalone mode...")
         start_bot()
     except Exception as e:
-        logger.error(f"Failed to start bot in standalone mode: {e}")
-        raise
+        # The traceback is logged here, exit without printing it a second time
+        logger.error("Failed to start bot in standalone mode: %s", e, exc_info=True)
+        raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
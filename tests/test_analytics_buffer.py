@@ -0,0 +1,88 @@
+"""
+Tests for utils.analytics_buffer.
+Run with: python -m unittest discover tests
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+from utils.analytics_buffer import AnalyticsBuffer  # noqa: E402
+
+# The tests that write to the database need the web app, skip them when it can't be imported
+try:
+    from app import app, db  # noqa: E402  (imported before the models, see app.py)
+    from models import Analytics  # noqa: E402
+except ImportError as e:
+    app = None
+    app_import_error = str(e)
+else:
+    app_import_error = None
+
+class AnalyticsBufferTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_events_get_the_same_columns(self):
+        buffer = AnalyticsBuffer()
+        buffer.put_nowait({"event_type": "bot_start", "chat_id": 1})
+        buffer.put_nowait({"event_type": "quiz_start", "quiz_id": 7, "user_id": 3})
+
+        first = buffer._queue.get_nowait()
+        second = buffer._queue.get_nowait()
+        self.assertEqual(first.keys(), second.keys())
+        self.assertIsNone(first["quiz_id"])
+
+    async def test_flush_writes_in_batches(self):
+        buffer = AnalyticsBuffer(max_batch=2)
+        batches = []
+        buffer._write = lambda batch, touched: batches.append(len(batch))
+        for _ in range(5):
+            buffer.put_nowait({"event_type": "question_answer"})
+        await buffer.flush()
+
+        self.assertEqual(batches, [2, 2, 1])
+
+    async def test_full_buffer_drops_events(self):
+        buffer = AnalyticsBuffer()
+        buffer._queue = asyncio.Queue(maxsize=1)
+        buffer.put_nowait({"event_type": "bot_start"})
+        with self.assertLogs("utils.analytics_buffer", "WARNING"):
+            buffer.put_nowait({"event_type": "bot_start"})
+
+        self.assertEqual(buffer._queue.qsize(), 1)
+
+@unittest.skipUnless(app, f"the app can't be imported: {app_import_error}")
+class AnalyticsBufferDatabaseTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        with app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with app.app_context():
+            db.drop_all()
+
+    async def test_flush_keeps_columns_missing_from_the_first_event(self):
+        buffer = AnalyticsBuffer()
+        buffer.put_nowait({"event_type": "bot_start", "chat_id": 1})
+        buffer.put_nowait({"event_type": "quiz_start", "quiz_id": 7, "user_id": 3})
+        await buffer.flush()
+
+        with app.app_context():
+            rows = [(a.event_type, a.quiz_id, a.user_id, a.chat_id)
+                    for a in Analytics.query.order_by(Analytics.id)]
+        self.assertEqual(rows, [("bot_start", None, None, 1), ("quiz_start", 7, 3, None)])
+
+    async def test_stop_flushes_pending_events(self):
+        buffer = AnalyticsBuffer(flush_interval=60)
+        await buffer.start()
+        buffer.put_nowait({"event_type": "bot_start"})
+        await buffer.stop()
+
+        with app.app_context():
+            self.assertEqual(Analytics.query.count(), 1)
+
+if __name__ == "__main__":
+    unittest.main()
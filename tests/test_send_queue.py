@@ -0,0 +1,140 @@
+"""
+Tests for utils.send_queue.
+Run with: python -m unittest discover tests
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+from telegram.error import NetworkError, RetryAfter
+from utils import send_queue
+from utils.send_queue import TelegramSendQueue
+
+class FakeBot:
+    """Records Bot API calls, optionally failing the first calls with the given errors"""
+
+    def __init__(self, errors=()):
+        self.calls = []
+        self.errors = list(errors)
+
+    async def _call(self, method, kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.calls.append((method, kwargs))
+
+    async def send_message(self, **kwargs):
+        await self._call("send_message", kwargs)
+
+    async def edit_message_text(self, **kwargs):
+        await self._call("edit_message_text", kwargs)
+
+@mock.patch.object(send_queue, "PER_CHAT_INTERVAL", 0.01)
+class TelegramSendQueueTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.queue = TelegramSendQueue(workers=4)
+
+    async def asyncTearDown(self):
+        await self.queue.stop()
+
+    async def drain(self):
+        while self.queue._size or self.queue._scheduled:
+            await asyncio.sleep(0.005)
+
+    async def test_calls_for_a_chat_are_delivered_in_order(self):
+        bot = FakeBot()
+        await self.queue.start(bot)
+        for i in range(5):
+            await self.queue.enqueue(1, "send_message", {"text": str(i)})
+            await self.queue.enqueue(2, "send_message", {"text": str(i)})
+        await self.drain()
+
+        for chat_id in (1, 2):
+            texts = [kwargs["text"] for _, kwargs in bot.calls if kwargs["chat_id"] == chat_id]
+            self.assertEqual(texts, ["0", "1", "2", "3", "4"])
+
+    async def test_pending_edits_of_a_message_are_coalesced(self):
+        bot = FakeBot()
+        await self.queue.start(bot)
+        await self.queue.enqueue(1, "send_message", {"text": "question"})
+        for i in range(3):
+            await self.queue.enqueue(1, "edit_message_text", {"message_id": 10, "text": str(i)})
+        await self.drain()
+
+        self.assertEqual(bot.calls[1:], [("edit_message_text", {"message_id": 10, "text": "2", "chat_id": 1})])
+
+    async def test_reply_text_is_sent_as_a_reply(self):
+        bot = FakeBot()
+        await self.queue.start(bot)
+        message = mock.Mock(message_id=42)
+        await self.queue.enqueue(1, "reply_text", {"text": "hi", **send_queue.reply_to_kwargs(message)})
+        await self.drain()
+
+        method, kwargs = bot.calls[0]
+        self.assertEqual(method, "send_message")
+        self.assertEqual(kwargs["reply_to_message_id"], 42)
+
+    async def test_flood_limited_call_is_retried_first(self):
+        bot = FakeBot(errors=[RetryAfter(0)])
+        await self.queue.start(bot)
+        await self.queue.enqueue(1, "send_message", {"text": "first"})
+        await self.queue.enqueue(1, "send_message", {"text": "second"})
+        await self.drain()
+
+        self.assertEqual([kwargs["text"] for _, kwargs in bot.calls], ["first", "second"])
+
+    async def test_flood_limit_pauses_the_chat(self):
+        bot = FakeBot(errors=[RetryAfter(1)])
+        await self.queue.start(bot)
+        await self.queue.enqueue(1, "send_message", {"text": "first"})
+        await asyncio.sleep(0.2)
+
+        self.assertEqual(bot.calls, [])
+        self.assertEqual(self.queue._size, 1)
+
+    async def test_failed_call_is_dropped(self):
+        bot = FakeBot(errors=[NetworkError("boom")])
+        await self.queue.start(bot)
+        await self.queue.enqueue(1, "send_message", {"text": "lost"})
+        await self.queue.enqueue(1, "send_message", {"text": "delivered"})
+        with self.assertLogs("utils.send_queue", "ERROR"):
+            await self.drain()
+
+        self.assertEqual([kwargs["text"] for _, kwargs in bot.calls], ["delivered"])
+
+    async def test_idle_chats_are_forgotten(self):
+        bot = FakeBot()
+        await self.queue.start(bot)
+        for chat_id in range(3):
+            await self.queue.enqueue(chat_id, "send_message", {"text": "hi"})
+        await self.drain()
+        self.assertEqual(len(self.queue._next_send), 3)
+
+        await asyncio.sleep(send_queue.PER_CHAT_INTERVAL * 2)
+        self.assertEqual(self.queue._next_send, {})
+
+    async def test_backlog_notice_is_sent_once(self):
+        bot = FakeBot()
+        released = asyncio.Event()
+        deliver = bot._call
+
+        async def blocked_call(method, kwargs):
+            await released.wait()
+            await deliver(method, kwargs)
+
+        bot._call = blocked_call
+        await self.queue.start(bot)
+        with mock.patch.object(send_queue, "BACKLOG_NOTICE_THRESHOLD", 2):
+            for i in range(4):
+                await self.queue.enqueue(1, "send_message", {"text": str(i)})
+        self.assertEqual(len(self.queue._notices), 1)
+
+        released.set()
+        await self.drain()
+        await asyncio.gather(*self.queue._notices)
+
+        texts = [kwargs["text"] for _, kwargs in bot.calls]
+        self.assertEqual(texts.count(send_queue.BACKLOG_NOTICE_TEXT), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Tests for utils.session_store.
+Run with: python -m unittest discover tests
+
+The Lua scripts run against fakeredis, these tests are skipped when it (or
+lupa, which it uses to run Lua) isn't installed: pip install fakeredis[lua]
+"""
+
+import types
+import unittest
+from unittest import mock
+from utils import session_store
+from utils.session_store import ACTIVE_KEY, DIRTY_KEY, QuizSessionStore
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401
+except ImportError:
+    fakeredis = None
+
+def make_session(session_id, current_question_index=0):
+    return types.SimpleNamespace(
+        id=session_id, quiz_id=5, chat_id=-100, current_question_index=current_question_index,
+        is_paused=False, marathon_mode=False,
+    )
+
+@unittest.skipUnless(fakeredis, "fakeredis with Lua support is not installed")
+@mock.patch.object(session_store, "MAX_QUIZ_SESSIONS", 2)
+class QuizSessionStoreTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.persisted = []
+        self.store = QuizSessionStore("redis://localhost", snapshot_interval=3600)
+        self.store._persist = self.persisted.extend
+        with mock.patch.object(session_store.Redis, "from_url",
+                               return_value=fakeredis.FakeAsyncRedis(decode_responses=True)):
+            await self.store.start()
+
+    async def asyncTearDown(self):
+        await self.store.stop()
+
+    async def expire(self, session_id):
+        await self.store.redis.delete(self.store._key(session_id))
+
+    async def test_create_at_capacity(self):
+        self.assertTrue(await self.store.create(make_session(1)))
+        self.assertTrue(await self.store.create(make_session(2)))
+        self.assertFalse(await self.store.create(make_session(3)))
+
+        self.assertEqual(await self.store.count_active(), 2)
+        self.assertIsNone(await self.store.get(3))
+
+    async def test_create_after_sessions_expire(self):
+        await self.store.create(make_session(1))
+        await self.store.create(make_session(2))
+        # Expired sessions are dropped from the active set before the capacity check
+        await self.store.redis.zadd(ACTIVE_KEY, {"1": 0})
+
+        self.assertTrue(await self.store.create(make_session(3)))
+        self.assertEqual(await self.store.count_active(), 2)
+
+    async def test_next_question(self):
+        await self.store.create(make_session(1, current_question_index=3))
+
+        self.assertEqual(await self.store.next_question(1), 4)
+        self.assertEqual((await self.store.get(1))["current_question_index"], 4)
+        self.assertEqual(await self.store.redis.smembers(DIRTY_KEY), {"1"})
+
+    async def test_update_expired_session(self):
+        await self.store.create(make_session(1))
+        await self.expire(1)
+
+        self.assertFalse(await self.store.pause(1))
+        self.assertFalse(await self.store.set_question_index(1, 2))
+        # Not recreated as a partial hash, and not marked for the next snapshot
+        self.assertFalse(await self.store.redis.exists(self.store._key(1)))
+        self.assertIsNone(await self.store.get(1))
+        self.assertEqual(await self.store.redis.smembers(DIRTY_KEY), set())
+
+    async def test_next_question_expired_session(self):
+        await self.store.create(make_session(1))
+        await self.expire(1)
+
+        self.assertIsNone(await self.store.next_question(1))
+        self.assertFalse(await self.store.redis.exists(self.store._key(1)))
+        self.assertEqual(await self.store.redis.smembers(DIRTY_KEY), set())
+
+    async def test_snapshot(self):
+        await self.store.create(make_session(1))
+        await self.store.create(make_session(2))
+        await self.store.next_question(1)
+        await self.store.pause(2)
+
+        await self.store.snapshot()
+
+        self.assertCountEqual(self.persisted, [
+            {"id": 1, "current_question_index": 1, "is_paused": False},
+            {"id": 2, "current_question_index": 0, "is_paused": True},
+        ])
+        self.assertEqual(await self.store.redis.smembers(DIRTY_KEY), set())
+
+    async def test_snapshot_requeues_on_persist_failure(self):
+        await self.store.create(make_session(1))
+        await self.store.next_question(1)
+        self.store._persist = mock.Mock(side_effect=RuntimeError("database unavailable"))
+
+        with self.assertRaises(RuntimeError):
+            await self.store.snapshot()
+        self.assertEqual(await self.store.redis.smembers(DIRTY_KEY), {"1"})
+
+        self.store._persist = self.persisted.extend
+        await self.store.snapshot()
+        self.assertEqual(self.persisted, [{"id": 1, "current_question_index": 1, "is_paused": False}])
+
+    async def test_end(self):
+        await self.store.create(make_session(1))
+        await self.store.next_question(1)
+
+        await self.store.end(1)
+
+        self.assertEqual(self.persisted, [
+            {"id": 1, "is_active": False, "current_question_index": 1, "is_paused": False},
+        ])
+        self.assertIsNone(await self.store.get(1))
+        self.assertEqual(await self.store.count_active(), 0)
+        self.assertEqual(await self.store.redis.smembers(DIRTY_KEY), set())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Buffered writer for analytics events and user activity timestamps.
+Events are collected in memory and written in batches by a background task,
+so handlers don't pay for a commit on every event.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from sqlalchemy import update
+
+logger = logging.getLogger(__name__)
+
+MAX_BUFFERED_EVENTS = 10_000
+MAX_BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.25  # seconds
+
+# Optional Analytics columns. Each batch is one executemany built from the first
+# row's keys, so every event must carry all of them.
+OPTIONAL_EVENT_COLUMNS = ("quiz_id", "user_id", "chat_id")
+
+class AnalyticsBuffer:
+    """Collects analytics rows and last active updates and flushes them in batches"""
+
+    def __init__(self, max_batch=MAX_BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue = asyncio.Queue(maxsize=MAX_BUFFERED_EVENTS)
+        self._batch_ready = asyncio.Event()
+        self._last_active = {}  # user_id -> last activity time
+        self._task = None
+
+    def put_nowait(self, event):
+        """Buffer an analytics event (a dict of Analytics column values)"""
+        event.setdefault("date", datetime.utcnow())
+        event.setdefault("event_data", {})
+        for column in OPTIONAL_EVENT_COLUMNS:
+            event.setdefault(column, None)
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Analytics buffer full, dropping %s event", event.get('event_type'))
+            return
+
+        if self._queue.qsize() >= self.max_batch:
+            self._batch_ready.set()
+
+    def touch_user(self, user_id, when=None):
+        """Record user activity, written as a single UPDATE per flush"""
+        self._last_active[user_id] = when or datetime.utcnow()
+
+    async def start(self):
+        """Start the background flush task"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and write everything still buffered"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write buffered events and activity updates to the database"""
+        while True:
+            batch = []
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            touched, self._last_active = self._last_active, {}
+            if not batch and not touched:
+                return
+
+            try:
+                await asyncio.to_thread(self._write, batch, touched)
+            except Exception as e:
+                logger.error("Error flushing analytics buffer: %s", e)
+
+            if len(batch) < self.max_batch:
+                return
+
+    @staticmethod
+    def _write(batch, touched):
+        from app import app, db
+        from models import Analytics, User
+
+        with app.app_context():
+            if batch:
+                db.session.execute(Analytics.__table__.insert(), batch)
+            if touched:
+                db.session.execute(
+                    update(User.__table__)
+                    .where(User.id.in_(list(touched)))
+                    .values(last_active=max(touched.values()))
+                )
+            db.session.commit()
@@ -0,0 +1,87 @@
+"""
+Daily analytics rollup.
+On PostgreSQL the per-day event counts are kept in the analytics_daily
+materialized view, refreshed in the background, so analytics queries read a
+few pre-aggregated rows instead of scanning the analytics table.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import DDL, event, func, select, text
+from app import db
+from models import Analytics
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 60  # seconds
+
+# The unique index is required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+ANALYTICS_DAILY_DDL = [
+    "CREATE MATERIALIZED VIEW IF NOT EXISTS analytics_daily AS "
+    "SELECT date_trunc('day', date) AS day, event_type, count(*) AS events "
+    "FROM analytics GROUP BY 1, 2",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_analytics_daily_day_event "
+    "ON analytics_daily (day, event_type)",
+]
+
+# Created together with the analytics table by metadata.create_all()
+for statement in ANALYTICS_DAILY_DDL:
+    event.listen(Analytics.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+def create_analytics_daily(conn):
+    """Create the materialized view on a connection, if the database supports it"""
+    if conn.dialect.name != 'postgresql':
+        return
+    for statement in ANALYTICS_DAILY_DDL:
+        conn.exec_driver_sql(statement)
+
+def is_available():
+    """The materialized view only exists on PostgreSQL"""
+    return db.engine.dialect.name == 'postgresql'
+
+def refresh_analytics_daily(app):
+    """Refresh the materialized view without blocking readers"""
+    with app.app_context():
+        try:
+            db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY analytics_daily"))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("Error refreshing analytics_daily: %s", e)
+
+def start_analytics_refresh(app):
+    """Schedule the periodic refresh of the materialized view, returns the scheduler"""
+    with app.app_context():
+        if not is_available():
+            return None
+
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(refresh_analytics_daily, 'interval', seconds=REFRESH_INTERVAL,
+                      args=[app], max_instances=1, coalesce=True)
+    scheduler.start()
+    logger.info("Refreshing analytics_daily every %d seconds", REFRESH_INTERVAL)
+    return scheduler
+
+def get_daily_event_counts(days=30):
+    """Get the number of events per day and event type for the last `days` days"""
+    since = datetime.utcnow() - timedelta(days=days)
+
+    if is_available():
+        statement = text(
+            "SELECT day, event_type, events FROM analytics_daily "
+            "WHERE day >= date_trunc('day', CAST(:since AS timestamp)) ORDER BY day, event_type"
+        ).bindparams(since=since)
+    else:
+        day = func.date(Analytics.date)
+        statement = (
+            select(day, Analytics.event_type, func.count(Analytics.id))
+            .where(Analytics.date >= since)
+            .group_by(day, Analytics.event_type)
+            .order_by(day, Analytics.event_type)
+        )
+
+    return [
+        {'date': str(row[0])[:10], 'event_type': row[1], 'count': row[2]}
+        for row in db.session.execute(statement)
+    ]
@@ -0,0 +1,75 @@
+"""
+Fast loading of the .env file.
+The .env file is parsed once and compiled into a Python module (env_cache.py
+in the project root). Later runs import that module, which Python loads from
+its cached bytecode, instead of parsing .env again.
+"""
+
+import importlib.util
+import logging
+import os
+import tempfile
+from dotenv import dotenv_values
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV_FILE = os.path.join(BASE_DIR, '.env')
+ENV_CACHE_FILE = os.path.join(BASE_DIR, 'env_cache.py')
+
+logger = logging.getLogger(__name__)
+
+def _is_stale():
+    try:
+        return os.path.getmtime(ENV_FILE) > os.path.getmtime(ENV_CACHE_FILE)
+    except OSError:
+        return True
+
+def _read_env_file():
+    # No ${VAR} expansion, values are used exactly as written
+    return {k: v for k, v in dotenv_values(ENV_FILE, interpolate=False).items() if v is not None}
+
+def _write_cache(values):
+    """Compile the values into env_cache.py (atomically, readable by the owner only)"""
+    # A unique temporary file, so processes starting together don't overwrite each other's
+    fd, tmp_path = tempfile.mkstemp(dir=BASE_DIR, prefix='.env_cache.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write("# Generated from .env by utils.env_cache, do not edit\n")
+            f.write(f"ENV = {values!r}\n")
+        os.replace(tmp_path, ENV_CACHE_FILE)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    # Bytecode is validated by mtime with one second resolution, drop it explicitly
+    try:
+        os.remove(importlib.util.cache_from_source(ENV_CACHE_FILE))
+    except OSError:
+        pass
+
+def _load_cache():
+    spec = importlib.util.spec_from_file_location('env_cache', ENV_CACHE_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ENV
+
+def load_env_fast():
+    """Load variables from .env without overriding ones already in the environment.
+
+    Set DOTENV_SKIP=1 where the environment is provided by the platform
+    (e.g. Koyeb) to skip looking for a .env file at all.
+    """
+    if os.environ.get('DOTENV_SKIP') or not os.path.exists(ENV_FILE):
+        return
+
+    if _is_stale():
+        values = _read_env_file()
+        try:
+            _write_cache(values)
+        except OSError as e:
+            # e.g. a read-only project directory, use the parsed values directly
+            logger.warning("Could not write the .env cache: %s", e)
+    else:
+        values = _load_cache()
+
+    for key, value in values.items():
+        os.environ.setdefault(key, value)
@@ -0,0 +1,40 @@
+"""
+Logging setup shared by the app, the bot and the scripts.
+"""
+
+import logging
+import os
+import time
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class CachedFormatter(logging.Formatter):
+    """Formatter that formats the timestamp once per second instead of once per record"""
+
+    default_time_format = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (second, formatted time), replaced as a whole so threads never see a mismatched pair
+        self._cached_time = (None, '')
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, formatted = self._cached_time
+        if second != cached_second:
+            formatted = time.strftime(datefmt or self.default_time_format, self.converter(second))
+            self._cached_time = (second, formatted)
+
+        if datefmt:
+            return formatted
+        return self.default_msec_format % (formatted, record.msecs)
+
+def configure_logging():
+    """Configure the root logger with the shared format and cached timestamps.
+
+    The level is taken from LOG_LEVEL (default INFO, LOG_LEVEL=DEBUG for verbose
+    output). Only the first call has an effect, like logging.basicConfig().
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(CachedFormatter(LOG_FORMAT))
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), handlers=[handler])
@@ -0,0 +1,168 @@
+"""
+Rate limited queue for outgoing Telegram API calls.
+Handlers enqueue their messages and return immediately, a small pool of
+workers delivers them while respecting Telegram's flood limits.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from aiolimiter import AsyncLimiter
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about 30 messages per second for a bot and 1 per second per chat
+GLOBAL_RATE_LIMIT = 30
+PER_CHAT_INTERVAL = 1.0
+BACKLOG_NOTICE_THRESHOLD = 500
+BACKLOG_NOTICE_TEXT = "Processing… please wait a moment."
+
+# Handler style method names mapped to the Bot API call used to deliver them
+METHOD_ALIASES = {
+    "reply_text": "send_message",
+}
+
+def reply_to_kwargs(message):
+    """Arguments that keep a queued reply_text threaded under the message it answers"""
+    return {"reply_to_message_id": message.message_id, "allow_sending_without_reply": True}
+
+class TelegramSendQueue:
+    """Queue of outgoing bot calls with global and per-chat throttling.
+
+    Calls for the same chat are delivered in order, pending edits of the same
+    message are coalesced so only the latest text is sent.
+    """
+
+    def __init__(self, workers=8):
+        self.workers = workers
+        self.bot = None
+        self._limiter = AsyncLimiter(GLOBAL_RATE_LIMIT, 1)
+        self._ready = None
+        self._tasks = []
+        self._pending = {}  # chat_id -> deque of pending calls
+        self._scheduled = set()  # chats waiting in the ready queue or for their interval
+        self._next_send = {}  # chat_id -> monotonic time of the next allowed send
+        self._edits = {}  # (chat_id, message_id) -> pending edit call
+        self._notified = set()
+        self._notices = set()  # running notice tasks, referenced until they finish
+        self._size = 0
+
+    async def start(self, bot):
+        """Start the delivery workers"""
+        self.bot = bot
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Telegram send queue started with %d workers", self.workers)
+
+    async def stop(self):
+        """Stop the delivery workers, dropping anything still pending"""
+        for task in self._tasks + list(self._notices):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._notices, return_exceptions=True)
+        self._tasks = []
+        if self._size:
+            logger.warning("Telegram send queue stopped with %d pending calls", self._size)
+
+    async def enqueue(self, chat_id, method, kwargs):
+        """Queue a Bot API call for the given chat"""
+        method = METHOD_ALIASES.get(method, method)
+        kwargs = dict(kwargs, chat_id=chat_id)
+
+        # Replace a pending edit of the same message instead of queuing another one
+        message_id = kwargs.get("message_id")
+        if method == "edit_message_text" and message_id is not None:
+            pending_edit = self._edits.get((chat_id, message_id))
+            if pending_edit is not None:
+                pending_edit["kwargs"] = kwargs
+                return
+
+        call = {"method": method, "kwargs": kwargs}
+        if method == "edit_message_text" and message_id is not None:
+            self._edits[(chat_id, message_id)] = call
+
+        self._pending.setdefault(chat_id, deque()).append(call)
+        self._size += 1
+        self._schedule(chat_id)
+
+        if self._size > BACKLOG_NOTICE_THRESHOLD and chat_id not in self._notified:
+            self._notified.add(chat_id)
+            task = asyncio.create_task(self._send_notice(chat_id))
+            self._notices.add(task)
+            task.add_done_callback(self._notices.discard)
+
+    def _schedule(self, chat_id):
+        """Put the chat in the ready queue once its per-chat interval has passed"""
+        if chat_id in self._scheduled:
+            return
+        self._scheduled.add(chat_id)
+
+        delay = self._next_send.get(chat_id, 0) - time.monotonic()
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, chat_id)
+        else:
+            self._next_send.pop(chat_id, None)
+            self._ready.put_nowait(chat_id)
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+
+            # The chat stays in _scheduled while its call is in flight so no
+            # other worker can pick it up and break the per-chat ordering
+            calls = self._pending.get(chat_id)
+            if calls:
+                call = calls.popleft()
+                self._size -= 1
+                kwargs = call["kwargs"]
+                if call["method"] == "edit_message_text":
+                    self._edits.pop((chat_id, kwargs.get("message_id")), None)
+
+                retry_after = await self._deliver(call["method"], kwargs)
+                if retry_after is None:
+                    self._next_send[chat_id] = time.monotonic() + PER_CHAT_INTERVAL
+                else:
+                    # Flood limit hit, pause the chat and retry the call first
+                    self._requeue(chat_id, calls, call)
+                    self._next_send[chat_id] = time.monotonic() + retry_after
+
+            self._scheduled.discard(chat_id)
+            if calls:
+                self._schedule(chat_id)
+            else:
+                self._pending.pop(chat_id, None)
+                self._notified.discard(chat_id)
+                # Forget the chat's send time once it no longer delays anything
+                delay = max(self._next_send.get(chat_id, 0) - time.monotonic(), 0)
+                asyncio.get_running_loop().call_later(delay, self._forget_chat, chat_id)
+
+    def _forget_chat(self, chat_id):
+        if chat_id not in self._scheduled and self._next_send.get(chat_id, 0) <= time.monotonic():
+            self._next_send.pop(chat_id, None)
+
+    def _requeue(self, chat_id, calls, call):
+        """Put a call back at the front of its chat's queue"""
+        if call["method"] == "edit_message_text":
+            key = (chat_id, call["kwargs"].get("message_id"))
+            if key in self._edits:
+                # A newer edit of the same message is already queued
+                return
+            self._edits[key] = call
+        calls.appendleft(call)
+        self._size += 1
+
+    async def _deliver(self, method, kwargs):
+        """Make the Bot API call, returns the seconds to wait if Telegram asked to retry later"""
+        try:
+            async with self._limiter:
+                await getattr(self.bot, method)(**kwargs)
+        except RetryAfter as e:
+            logger.warning("Flood limit hit for chat %s, retrying in %s seconds", kwargs.get('chat_id'), e.retry_after)
+            return e.retry_after
+        except Exception as e:
+            logger.error("Failed to deliver %s to chat %s: %s", method, kwargs.get('chat_id'), e)
+        return None
+
+    async def _send_notice(self, chat_id):
+        await self._deliver("send_message", {"chat_id": chat_id, "text": BACKLOG_NOTICE_TEXT})
@@ -0,0 +1,218 @@
+"""
+Redis backed store for the live state of active quiz sessions.
+Question progression and pause state change on every answer, so they are kept
+in Redis and only written back to the quiz_sessions table periodically and
+when the session ends.
+"""
+
+import asyncio
+import logging
+import time
+from redis.asyncio import Redis
+from sqlalchemy import update
+from config import MAX_QUIZ_SESSIONS
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "quiz:session:"
+DIRTY_KEY = "quiz:sessions:dirty"
+ACTIVE_KEY = "quiz:sessions:active"  # sorted set of session ids scored by expiry time
+SESSION_TTL = 3600  # seconds without activity before a session expires
+SNAPSHOT_INTERVAL = 30  # seconds between writes to the database
+
+# The scripts below run atomically in Redis. Updates only touch sessions that
+# still exist, so an expired session is never recreated as a partial hash.
+
+# KEYS: session, active set. ARGV: now, ttl, max sessions, session id, field/value pairs
+CREATE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 5))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[1] + ARGV[2], ARGV[4])
+return 1
+"""
+
+# KEYS: session, dirty set, active set. ARGV: now, ttl, session id, field/value pairs
+UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[1] + ARGV[2], ARGV[3])
+return 1
+"""
+
+# KEYS: session, dirty set, active set. ARGV: now, ttl, session id
+NEXT_QUESTION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local index = redis.call('HINCRBY', KEYS[1], 'idx', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[1] + ARGV[2], ARGV[3])
+return index
+"""
+
+class QuizSessionStore:
+    """Live quiz session state in Redis, periodically persisted to QuizSession rows"""
+
+    def __init__(self, redis_url, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.redis_url = redis_url
+        self.snapshot_interval = snapshot_interval
+        self.redis = None
+        self._create_script = None
+        self._update_script = None
+        self._next_question_script = None
+        self._task = None
+
+    @staticmethod
+    def _key(session_id):
+        return f"{KEY_PREFIX}{session_id}"
+
+    async def start(self):
+        """Connect to Redis and start the snapshot watchdog"""
+        self.redis = Redis.from_url(self.redis_url, decode_responses=True)
+        self._create_script = self.redis.register_script(CREATE_SCRIPT)
+        self._update_script = self.redis.register_script(UPDATE_SCRIPT)
+        self._next_question_script = self.redis.register_script(NEXT_QUESTION_SCRIPT)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the watchdog, persist pending changes and close the connection pool"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.snapshot()
+        await self.redis.aclose()
+
+    async def count_active(self):
+        """Count live sessions, dropping the ones that have expired"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(ACTIVE_KEY, "-inf", time.time())
+            pipe.zcard(ACTIVE_KEY)
+            _, count = await pipe.execute()
+        return count
+
+    async def create(self, session):
+        """Start tracking a newly created QuizSession, returns False when at capacity"""
+        # The capacity check and the insert are one script, so concurrent creates can't overshoot
+        fields = {
+            "quiz_id": session.quiz_id,
+            "chat_id": session.chat_id,
+            "idx": session.current_question_index or 0,
+            "paused": int(bool(session.is_paused)),
+            "marathon": int(bool(session.marathon_mode)),
+        }
+        created = await self._create_script(
+            keys=[self._key(session.id), ACTIVE_KEY],
+            args=[time.time(), SESSION_TTL, MAX_QUIZ_SESSIONS, session.id, *_flatten(fields)],
+        )
+        return bool(created)
+
+    async def get(self, session_id):
+        """Return the live state of a session, or None if it isn't active"""
+        state = await self.redis.hgetall(self._key(session_id))
+        if "quiz_id" not in state or "chat_id" not in state:
+            return None
+        return {
+            "quiz_id": int(state["quiz_id"]),
+            "chat_id": int(state["chat_id"]),
+            "current_question_index": int(state.get("idx", 0)),
+            "is_paused": state.get("paused") == "1",
+            "marathon_mode": state.get("marathon") == "1",
+        }
+
+    async def _update(self, session_id, **fields):
+        """Update a live session, returns False if it has expired or ended"""
+        updated = await self._update_script(
+            keys=[self._key(session_id), DIRTY_KEY, ACTIVE_KEY],
+            args=[time.time(), SESSION_TTL, session_id, *_flatten(fields)],
+        )
+        return bool(updated)
+
+    async def set_question_index(self, session_id, index):
+        return await self._update(session_id, idx=index)
+
+    async def next_question(self, session_id):
+        """Advance to the next question and return its index, or None if the session expired"""
+        return await self._next_question_script(
+            keys=[self._key(session_id), DIRTY_KEY, ACTIVE_KEY],
+            args=[time.time(), SESSION_TTL, session_id],
+        )
+
+    async def pause(self, session_id):
+        return await self._update(session_id, paused=1)
+
+    async def resume(self, session_id):
+        return await self._update(session_id, paused=0)
+
+    async def end(self, session_id):
+        """Persist the final state of a session and stop tracking it"""
+        state = await self.get(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(session_id))
+            pipe.srem(DIRTY_KEY, session_id)
+            pipe.zrem(ACTIVE_KEY, session_id)
+            await pipe.execute()
+
+        values = {"id": int(session_id), "is_active": False}
+        if state:
+            values["current_question_index"] = state["current_question_index"]
+            values["is_paused"] = state["is_paused"]
+        await asyncio.to_thread(self._persist, [values])
+
+    async def snapshot(self):
+        """Write the state of all sessions changed since the last snapshot"""
+        session_ids = await self.redis.spop(DIRTY_KEY, MAX_QUIZ_SESSIONS)
+        if not session_ids:
+            return
+
+        try:
+            rows = []
+            for session_id in session_ids:
+                state = await self.get(session_id)
+                if state:
+                    rows.append({
+                        "id": int(session_id),
+                        "current_question_index": state["current_question_index"],
+                        "is_paused": state["is_paused"],
+                    })
+            if rows:
+                await asyncio.to_thread(self._persist, rows)
+        except BaseException:
+            # Keep the sessions dirty so the next snapshot writes them
+            await self.redis.sadd(DIRTY_KEY, *session_ids)
+            raise
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception as e:
+                logger.error("Error saving quiz session snapshot: %s", e)
+
+    @staticmethod
+    def _persist(rows):
+        from app import app, db
+        from models import QuizSession
+
+        with app.app_context():
+            # Group rows by their columns so each group is one executemany UPDATE
+            groups = {}
+            for row in rows:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            for group in groups.values():
+                db.session.execute(update(QuizSession), group)
+            db.session.commit()
+
+def _flatten(fields):
+    """Turn a mapping into the field, value, ... argument list of HSET"""
+    return [item for pair in fields.items() for item in pair]